@@ -1,5 +1,5 @@
 # ====== cr3d_logger.py ======
-import threading, queue, time, json, csv, pathlib, sys, math
+import threading, queue, time, json, csv, pathlib, sys, math, struct
 from collections import deque
 import tkinter as tk
 from tkinter import ttk, messagebox
@@ -39,27 +39,217 @@ CSV_HEADER = [
 LOCAL_TZ = get_localzone()
 LOGO_CANDIDATES = ["logo.png","cr3d_logo.png","CR3D_logo.png"]
 
+# Live panels
+PLOT_FPS = 10          # redraw cap, independent of event rate
+PH_SPAN_MV = 2000.0    # initial pulse-height axis; grows with the data
+DT_BINS = 40           # Δt histogram spans ~6 mean intervals
+DT_WARMUP = 20         # intervals needed before the Δt axis is scaled
+DT_WINDOW = 500        # recent intervals kept for the Δt histogram and fit
+
+# Firmware settings pushed at session start (SET <key> <value>)
+FW_DEFAULTS = {
+    "MODE":         "FIXED",
+    "BASELINE_MV":  880.0,
+    "THRESHOLD_MV": 50.0,
+    "PULSER":       "ON",
+}
+SIM_PORT = "SIM"         # cr3d_sim.SimSerial instead of a real board
+SIM_RATE_HZ = 2.0        # --sim-rate: true muon rate fed to the simulator
+SIM_SPEED = 1.0          # --sim-speed: 1 = real time, 0 = as fast as the reader pulls
+HELLO_TIMEOUT_S = 3.0   # Nano resets on port open; bootloader + setup() take ~2 s
+
+# ------ Firmware command / ack channel ------
+class CommandManager:
+    """Pipelines SET commands to the firmware and matches its JSON acks.
+
+    The reader thread feeds every parsed line to handle(); send() runs on a
+    worker thread and blocks until each setting is acked or has used up its
+    retries. The firmware's 64-byte RX buffer bounds how much is in flight.
+    """
+    def __init__(self, ser, ack_timeout_s=0.5, retries=3, max_inflight_bytes=48):
+        self.ser = ser
+        self.ack_timeout_s = ack_timeout_s
+        self.retries = retries
+        self.max_inflight_bytes = max_inflight_bytes
+        self.cond = threading.Condition()
+        self.send_lock = threading.Lock()
+        self.hello = None
+        self.config = {}     # last confirmed firmware config
+        self.acks = deque()
+        self.closed = False
+
+    def handle(self, obj):
+        typ = obj.get("type")
+        if typ == "hello":
+            with self.cond:
+                self.hello = obj
+                self.config.update(self._config_from_hello(obj))
+                self.cond.notify_all()
+            return True
+        if typ == "ack":
+            name = str(obj.get("cmd", "")).upper()
+            with self.cond:
+                self.config[name] = obj.get("val")
+                self.acks.append((name, obj.get("val")))
+                self.cond.notify_all()
+            return True
+        return False
+
+    def wait_hello(self, timeout_s=HELLO_TIMEOUT_S):
+        with self.cond:
+            self.cond.wait_for(lambda: self.hello is not None or self.closed, timeout_s)
+            return self.hello
+
+    def close(self):
+        with self.cond:
+            self.closed = True
+            self.cond.notify_all()
+
+    def snapshot(self):
+        with self.cond:
+            return dict(self.config)
+
+    def send(self, settings):
+        """Apply {key: value}; returns (confirmed, failed) once all settle."""
+        confirmed, failed = {}, []
+        # send_lock serialises senders; cond is only held for shared state so a
+        # blocking ser.write() never stalls handle() on the reader thread
+        with self.send_lock:
+            todo = deque()
+            with self.cond:
+                for k, v in settings.items():
+                    k = k.upper()
+                    # hello already reported this value -> nothing to send
+                    if self._same(self.config.get(k), v): confirmed[k] = self.config[k]
+                    else: todo.append((k, v))
+                self.acks.clear()
+            inflight = {}   # key -> [value, deadline, tries, nbytes]
+            while (todo or inflight) and not self.closed:
+                # Fill the pipeline up to the RX-buffer budget
+                while todo:
+                    key, val = todo[0]
+                    nbytes = len(self._line(key, val))
+                    used = sum(st[3] for st in inflight.values())
+                    if inflight and used + nbytes > self.max_inflight_bytes: break
+                    todo.popleft()
+                    if not self._write(key, val):
+                        failed.append(key); self.close(); break
+                    inflight[key] = [val, time.monotonic() + self.ack_timeout_s, 1, nbytes]
+                if not inflight or self.closed: break
+
+                wake = min(st[1] for st in inflight.values())
+                with self.cond:
+                    self.cond.wait_for(lambda: self.acks or self.closed,
+                                       max(0.0, wake - time.monotonic()))
+                    acks = list(self.acks)
+                    self.acks.clear()
+
+                for key, val in acks:
+                    st = inflight.get(key)
+                    if st is not None and self._same(val, st[0]):
+                        confirmed[key] = val
+                        del inflight[key]
+
+                now = time.monotonic()
+                for key, st in list(inflight.items()):
+                    if st[1] > now: continue
+                    if st[2] > self.retries:
+                        failed.append(key); del inflight[key]
+                    elif self._write(key, st[0]):
+                        st[1] = now + self.ack_timeout_s; st[2] += 1
+                    else:
+                        self.close(); break
+            failed.extend(inflight.keys())
+            failed.extend(k for k, _ in todo)
+        return confirmed, failed
+
+    # -- helpers --
+    @staticmethod
+    def _wire(val):
+        # Text that goes out in SET; the firmware parses and echoes this
+        return f"{val:g}" if isinstance(val, (int, float)) else str(val)
+
+    def _line(self, key, val):
+        return f"SET {key} {self._wire(val)}\n".encode()
+
+    def _write(self, key, val):
+        try:
+            self.ser.write(self._line(key, val))
+            return True
+        except Exception:
+            return False
+
+    @staticmethod
+    def _same(fw, want):
+        # fw: value reported by the firmware (ack/hello), want: value we sent
+        if fw is None or want is None: return False
+        try:
+            sent = float(CommandManager._wire(want))
+            return abs(float(fw) - CommandManager._echo1(sent)) < 1e-3
+        except (TypeError, ValueError):
+            return str(fw).upper() == str(want).upper()
+
+    @staticmethod
+    def _echo1(v):
+        # What Print::printFloat(v, 1) shows on AVR: float32, rounds half up
+        f32 = lambda x: struct.unpack("<f", struct.pack("<f", x))[0]
+        x = f32(f32(v) + f32(0.05))
+        ip = math.floor(x)
+        return ip + math.floor(f32(f32(x - ip) * 10.0)) / 10.0
+
+    @staticmethod
+    def _config_from_hello(h):
+        cfg = {}
+        if "baseline_mode" in h:     cfg["MODE"] = h["baseline_mode"]
+        if "fixed_baseline_mV" in h: cfg["BASELINE_MV"] = h["fixed_baseline_mV"]
+        if "threshold_mV" in h:      cfg["THRESHOLD_MV"] = h["threshold_mV"]
+        p = h.get("pulser") or {}
+        if "enabled" in p:   cfg["PULSER"] = "ON" if p["enabled"] else "OFF"
+        if "pulse_us" in p:  cfg["PULSE_US"] = p["pulse_us"]
+        if "period_ms" in p: cfg["PERIOD_MS"] = p["period_ms"]
+        return cfg
+
 # ------ Running histogram ------
 class RunningHist:
-    def __init__(self, bin_width_mv=10.0, max_bins=400):
-        self.w = float(bin_width_mv)
+    def __init__(self, bin_width=10.0, max_bins=400):
+        self.w = float(bin_width)
         self.max_bins = max_bins
         self.counts = {}
         self.total = 0
-    def add(self, mv):
-        if mv is None: return
-        b = int(max(0, mv // self.w))
+        self.dirty = set()   # bins changed since the last take_dirty()
+    def add(self, x):
+        if x is None: return
+        b = int(max(0, x // self.w))
         if b >= self.max_bins: b = self.max_bins - 1
         self.counts[b] = self.counts.get(b, 0) + 1
         self.total += 1
+        self.dirty.add(b)
+    def remove(self, x):
+        if x is None: return
+        b = int(max(0, x // self.w))
+        if b >= self.max_bins: b = self.max_bins - 1
+        c = self.counts.get(b, 0) - 1
+        if c < 0: return
+        if c: self.counts[b] = c
+        else: del self.counts[b]
+        self.total -= 1
+        self.dirty.add(b)
+    def take_dirty(self):
+        d, self.dirty = self.dirty, set()
+        return d
+    def centers(self):
+        return [(b + 0.5) * self.w for b in range(self.max_bins)]
     def mode_mpv(self):
         if not self.counts: return None
         b = max(self.counts.items(), key=lambda kv: kv[1])[0]
         return (b + 0.5) * self.w
 
 class CR3DApp(tk.Tk):
-    def __init__(self):
+    def __init__(self, sim=False, sim_rate_hz=SIM_RATE_HZ, sim_speed=SIM_SPEED):
         super().__init__()
+        self.sim_enabled = sim
+        self.sim_rate_hz = sim_rate_hz
+        self.sim_speed = sim_speed
         self.title(APP_TITLE)
         self.configure(bg=THEME["bg_dark"])
         try:
@@ -77,12 +267,18 @@ class CR3DApp(tk.Tk):
 
         # State
         self.ser = None
+        self.sim_session = False
+        self.cmd = None
         self.reader_thread = None
         self.reader_running = False
         self.q = queue.Queue()
         self.logging = False
         self.session_start = None
         self.session_csv = None
+        self.session_meta = None
+        self.fw_hello = None
+        self.fw_config = {}
+        self.fw_changes = []
         self.t0_pc = None
         self.t0_us = None
         self.el0 = None
@@ -101,7 +297,16 @@ class CR3DApp(tk.Tk):
         self.last_peak_mv = None
         self.sample_mv = deque(maxlen=1200)
         self.intervals = deque(maxlen=256)
-        self.hist = RunningHist(bin_width_mv=10.0, max_bins=600)
+        self.hist = RunningHist(bin_width=10.0, max_bins=600)
+        self.last_event_ts_us = None
+        self.dt_win = deque(maxlen=DT_WINDOW)
+        self.dt_win_sum = 0.0
+        self.dt_count = 0      # session totals, for the whole-run rate
+        self.dt_sum = 0.0
+        self.dt_hist = None
+        self.dt_rebinned = False
+        self.plot_dirty = False
+        self.next_frame = 0.0
         self.rate_env = deque(maxlen=180)
 
         # UI
@@ -296,6 +501,8 @@ class CR3DApp(tk.Tk):
         self.canvas = None
         self.ax = None
         self.line = None
+        self.ax_ph = self.ph_bars = None
+        self.ax_dt = self.dt_bars = self.dt_fit = None
         self.xs = []
         self.ys = []
 
@@ -335,6 +542,14 @@ class CR3DApp(tk.Tk):
         self._row(self.stats_frame, "Dead time", "deadtime_val")
         self._row(self.stats_frame, "Dead-time %", "deadfrac_val")
 
+        # --- Section: Firmware (confirmed by ack) ---
+        ttk.Label(self.stats_frame, text="Firmware", style="SideTitle.TLabel").pack(anchor="w", padx=14, pady=(12,6))
+        self._row(self.stats_frame, "Version", "fw_ver_val")
+        self._row(self.stats_frame, "Baseline", "fw_baseline_val")
+        self._row(self.stats_frame, "Threshold (mV)", "fw_thr_val")
+        self._row(self.stats_frame, "Pulser", "fw_pulser_val")
+        self._row(self.stats_frame, "Config", "fw_status_val")
+
         note = ttk.Label(self.stats_frame,
             text="Stats persist during a session.\nReset when you restart logging\nor relaunch the app.",
             style="SideSm.TLabel")
@@ -351,6 +566,22 @@ class CR3DApp(tk.Tk):
 
     # ---------- Controls ----------
     def _build_controls(self):
+        # Live reconfiguration (only while logging)
+        thr_row = ttk.Frame(self.actions_frame, style="Side.TFrame")
+        thr_row.pack(fill="x", pady=(0, 6))
+        ttk.Label(thr_row, text="Threshold (mV)", style="SideSm.TLabel").pack(side="left")
+        self.thr_var = tk.StringVar(value=f"{FW_DEFAULTS['THRESHOLD_MV']:g}")
+        self.thr_apply_btn = ttk.Button(thr_row, text="Apply", style="TopBtn.TButton", width=6,
+                                        command=self._apply_threshold, state="disabled")
+        self.thr_apply_btn.pack(side="right")
+        self.thr_entry = ttk.Entry(thr_row, textvariable=self.thr_var, width=7)
+        self.thr_entry.pack(side="right", padx=6)
+        self.thr_entry.bind("<Return>", lambda e: self._apply_threshold())
+
+        self.pulser_btn = ttk.Button(self.actions_frame, text="Toggle pulser", style="TopBtn.TButton",
+                                     command=self._toggle_pulser, state="disabled")
+        self.pulser_btn.pack(fill="x", pady=(0, 10))
+
         self.start_btn = ttk.Button(self.actions_frame, text="Start logging", style="Start.TButton", command=self._start_logging)
         self.start_btn.pack(fill="x", pady=(0, 6))
 
@@ -360,20 +591,25 @@ class CR3DApp(tk.Tk):
     # ---------- Ports / Connection ----------
     def _refresh_ports(self):
         ports = [p.device for p in serial.tools.list_ports.comports()]
-        self.port_cmb["values"] = ports
-        if ports:
-            cur = self.port_cmb.get()
-            self.port_cmb.set(cur if cur in ports else ports[0])
+        # SIM is only offered with --sim, and never picked as the default
+        self.port_cmb["values"] = ports + ([SIM_PORT] if self.sim_enabled else [])
+        cur = self.port_cmb.get()
+        if cur in ports or (cur == SIM_PORT and self.sim_enabled):
+            self.port_cmb.set(cur)
         else:
-            self.port_cmb.set("")
+            self.port_cmb.set(ports[0] if ports else "")
     def _is_selected_port_present(self):
         sel = self.port_cmb.get().strip()
         if not sel: return False
+        if sel == SIM_PORT: return False
         return sel in [p.device for p in serial.tools.list_ports.comports()]
     def _port_watchdog(self):
-        connected = (self.ser is not None and self.ser.is_open) or self._is_selected_port_present()
-        self.status_lbl.config(text=("Connected" if connected else "Disconnected"),
-                               foreground=("#69d18a" if connected else THEME["fg_main"]))
+        if self.sim_session:
+            self.status_lbl.config(text="Simulator", foreground=THEME["fg_main"])
+        else:
+            connected = (self.ser is not None and self.ser.is_open) or self._is_selected_port_present()
+            self.status_lbl.config(text=("Connected" if connected else "Disconnected"),
+                                   foreground=("#69d18a" if connected else THEME["fg_main"]))
         self._refresh_ports()
         self.after(1000, self._port_watchdog)
 
@@ -411,17 +647,29 @@ class CR3DApp(tk.Tk):
             messagebox.showerror("No port", "No serial port selected.")
             return
         try:
-            self.ser = serial.Serial(port, baudrate=115200, timeout=1)
+            self.sim_session = port == SIM_PORT and self.sim_enabled
+            if self.sim_session:
+                from cr3d_sim import SimSerial
+                self.ser = SimSerial(rate_hz=self.sim_rate_hz, speed=self.sim_speed or None)
+            else:
+                self.ser = serial.Serial(port, baudrate=115200, timeout=1, write_timeout=1)
         except serial.SerialException as e:
+            self.sim_session = False
             messagebox.showerror("Serial error", f"Could not open {port}:\n{e}")
             return
 
         self.logging = True
         self.session_start = pd.Timestamp.now(tz=LOCAL_TZ)
         stamp = self.session_start.strftime("%Y%m%d_%H%M%S")
-        self.session_csv = pathlib.Path(f"CR3D_{stamp}.csv")
+        tag = "SIM_" if self.sim_session else ""
+        self.session_csv = pathlib.Path(f"CR3D_{tag}{stamp}.csv")
         with self.session_csv.open("w", newline="") as f:
             csv.writer(f).writerow(CSV_HEADER)
+        self.session_meta = self.session_csv.with_suffix(".json")
+        self.fw_hello = None
+        self.fw_config = {}
+        self.fw_changes = []
+        self._write_session_meta()
 
         self.t0_pc = pd.Timestamp.now(tz=LOCAL_TZ)
         self.t0_us = None
@@ -436,31 +684,44 @@ class CR3DApp(tk.Tk):
         self.last_peak_mv = None
         self.sample_mv.clear()
         self.intervals.clear()
-        self.hist = RunningHist(bin_width_mv=10.0, max_bins=600)
+        self.hist = RunningHist(bin_width=10.0, max_bins=600)
+        self.last_event_ts_us = None
+        self.dt_win.clear()
+        self.dt_win_sum = 0.0
+        self.dt_count = 0
+        self.dt_sum = 0.0
+        self.dt_hist = None
         self._update_sidebar(force=True)
 
-        time.sleep(0.25)
-        for cmd in (b"SET MODE FIXED\n", b"SET BASELINE_MV 880\n", b"SET THRESHOLD_MV 50\n", b"SET PULSER ON\n"):
-            try: self.ser.write(cmd)
-            except Exception: pass
-
         self._create_plot()
 
+        self.cmd = CommandManager(self.ser)
         self.reader_running = True
         self.reader_thread = threading.Thread(target=self._reader, daemon=True)
         self.reader_thread.start()
 
+        # Wait for hello + push defaults off the UI thread
+        self.fw_status_val.config(text="waiting for hello…")
+        threading.Thread(target=self._configure_firmware,
+                         args=(self.cmd, dict(FW_DEFAULTS), True), daemon=True).start()
+
         self.start_btn.configure(state="disabled")
         self.stop_btn.configure(state="normal")
 
     def _stop_logging(self):
         self.reader_running = False
         self.logging = False
+        if self.cmd is not None:
+            self.cmd.close()
+            self.cmd = None
+        self.thr_apply_btn.configure(state="disabled")
+        self.pulser_btn.configure(state="disabled")
         try:
             if self.ser and self.ser.is_open: self.ser.close()
         except Exception:
             pass
         self.ser = None
+        self.sim_session = False
 
         self.start_btn.configure(state="normal")
         self.stop_btn.configure(state="disabled")
@@ -479,6 +740,9 @@ class CR3DApp(tk.Tk):
                     obj = json.loads(line)
                 except Exception:
                     continue
+                cmd = self.cmd
+                if cmd is not None and cmd.handle(obj):
+                    continue
                 if (self.t0_us is None) and ("ts_us" in obj):
                     self.t0_us = int(obj["ts_us"])
                 self.q.put(obj)
@@ -487,28 +751,130 @@ class CR3DApp(tk.Tk):
             except Exception:
                 continue
 
+    # ---------- Firmware config ----------
+    def _configure_firmware(self, cmd, settings, wait_hello=False):
+        # Worker thread: result goes back through the UI queue
+        if wait_hello:
+            cmd.wait_hello()
+        confirmed, failed = cmd.send(settings)
+        self.q.put({"type": "fw_config", "mgr": cmd, "hello": cmd.hello,
+                    "config": cmd.snapshot(), "requested": settings,
+                    "confirmed": confirmed, "failed": failed})
+
+    def _send_config(self, settings):
+        if self.cmd is None: return
+        self.fw_status_val.config(text="applying…")
+        threading.Thread(target=self._configure_firmware,
+                         args=(self.cmd, settings), daemon=True).start()
+
+    def _apply_threshold(self):
+        if not self.logging: return
+        try:
+            v = float(self.thr_var.get())
+            if v < 0 or math.isnan(v) or math.isinf(v): raise ValueError
+        except ValueError:
+            messagebox.showerror("Invalid threshold", "Threshold must be a non-negative number (mV).")
+            return
+        self._send_config({"THRESHOLD_MV": v})
+
+    def _toggle_pulser(self):
+        if not self.logging: return
+        cur = str(self.fw_config.get("PULSER", FW_DEFAULTS["PULSER"])).upper()
+        self._send_config({"PULSER": "OFF" if cur == "ON" else "ON"})
+
+    def _on_fw_config(self, obj):
+        if obj["mgr"] is not self.cmd or not self.logging: return
+        if obj["hello"] is not None: self.fw_hello = obj["hello"]
+        self.fw_config = obj["config"]
+        self.fw_changes.append({
+            "elapsed_s": round(time.perf_counter() - self.el0, 3) if self.el0 else None,
+            "requested": obj["requested"],
+            "confirmed": obj["confirmed"],
+            "failed": obj["failed"],
+        })
+        self._write_session_meta()
+
+        cfg = self.fw_config
+        ver = self.fw_hello.get("ver") if self.fw_hello else None
+        self.fw_ver_val.config(text=(f"v{ver}" if ver else "no hello"))
+        if "MODE" in cfg:
+            bl = f" {float(cfg['BASELINE_MV']):.0f} mV" if cfg["MODE"] == "FIXED" and "BASELINE_MV" in cfg else ""
+            self.fw_baseline_val.config(text=f"{cfg['MODE']}{bl}")
+        if "THRESHOLD_MV" in cfg:
+            self.fw_thr_val.config(text=f"{float(cfg['THRESHOLD_MV']):.1f}")
+        if "PULSER" in cfg:
+            self.fw_pulser_val.config(text=str(cfg["PULSER"]))
+        self.fw_status_val.config(text=("confirmed" if not obj["failed"] else "no ack: " + ", ".join(obj["failed"])))
+
+        self.thr_apply_btn.configure(state="normal")
+        self.pulser_btn.configure(state="normal")
+
+    def _write_session_meta(self):
+        if self.session_meta is None: return
+        meta = {
+            "session_start": self.session_start.isoformat() if self.session_start is not None else None,
+            "port": self.ser.port if self.ser is not None else None,
+            "simulated": self.sim_session,
+            "sim": {"rate_hz": self.sim_rate_hz, "speed": self.sim_speed} if self.sim_session else None,
+            "csv": self.session_csv.name if self.session_csv is not None else None,
+            "firmware_hello": self.fw_hello,
+            "firmware_config": self.fw_config,
+            "config_changes": self.fw_changes,
+        }
+        try:
+            with self.session_meta.open("w") as f:
+                json.dump(meta, f, indent=2)
+        except Exception:
+            pass
+
     # ---------- Plot helpers ----------
+    def _style_axes(self, ax, xlabel, ylabel, title):
+        ax.set_facecolor(THEME["bg_dark"])
+        for spine in ax.spines.values(): spine.set_color(THEME["fg_dim"])
+        ax.tick_params(colors=THEME["fg_main"])
+        ax.set_xlabel(xlabel, color=THEME["fg_main"])
+        ax.set_ylabel(ylabel, color=THEME["fg_main"])
+        ax.set_title(title, color=THEME["accent"])
+
     def _create_plot(self):
         if hasattr(self, "canvas") and self.canvas is not None: return
         for ch in self.plot_container.winfo_children(): ch.destroy()
         fig = Figure(dpi=100, facecolor=THEME["bg_panel_side"])
-        ax = fig.add_subplot(111)
-        ax.set_facecolor(THEME["bg_dark"])
-        for spine in ax.spines.values(): spine.set_color(THEME["fg_dim"])
-        ax.tick_params(colors=THEME["fg_main"])
-        ax.set_xlabel("Elapsed time (s)", color=THEME["fg_main"])
-        ax.set_ylabel("Voltage (mV)", color=THEME["fg_main"])
-        ax.set_title("A2 live readout", color=THEME["accent"])
+        gs = fig.add_gridspec(2, 2, height_ratios=[3, 2])
+
+        ax = fig.add_subplot(gs[0, :])
+        self._style_axes(ax, "Elapsed time (s)", "Voltage (mV)", "A2 live readout")
         ax.ticklabel_format(axis='x', style='plain'); ax.ticklabel_format(axis='y', style='plain')
         line, = ax.plot([], [], linewidth=1.4)
+
+        # Pulse-height spectrum: one bar per RunningHist bin, heights set in place
+        ax_ph = fig.add_subplot(gs[1, 0])
+        self._style_axes(ax_ph, "Peak (mV)", "Counts", "Pulse-height spectrum")
+        self.ph_bars = ax_ph.bar(self.hist.centers(), [0] * self.hist.max_bins,
+                                 width=self.hist.w, color=THEME["accent"], linewidth=0)
+        ax_ph.set_xlim(0, PH_SPAN_MV); ax_ph.set_ylim(0, 5)
+
+        # Δt distribution + exponential fit; bars are placed once the scale is known
+        ax_dt = fig.add_subplot(gs[1, 1])
+        self._style_axes(ax_dt, "Δt (s)", "Counts", "Δt distribution")
+        self.dt_bars = ax_dt.bar(range(DT_BINS), [0] * DT_BINS, width=1.0, align="edge",
+                                 color=THEME["accent"], linewidth=0)
+        self.dt_fit, = ax_dt.plot([], [], color=THEME["red"], linewidth=1.4)
+        ax_dt.set_xlim(0, DT_BINS); ax_dt.set_ylim(0, 5)
+        self.dt_rebinned = self.dt_hist is not None
+
         canvas = FigureCanvasTkAgg(fig, master=self.plot_container)
+        fig.tight_layout()
         canvas.draw(); canvas.get_tk_widget().pack(fill="both", expand=True)
         self.canvas, self.ax, self.line = canvas, ax, line
+        self.ax_ph, self.ax_dt = ax_ph, ax_dt
 
     def _destroy_plot(self):
         if hasattr(self, "canvas") and self.canvas is not None:
             self.canvas.get_tk_widget().destroy()
             self.canvas = self.ax = self.line = None
+            self.ax_ph = self.ph_bars = None
+            self.ax_dt = self.dt_bars = self.dt_fit = None
 
     def _append_plot(self, elapsed_s, mv):
         if not hasattr(self, "xs"): self.xs = []
@@ -516,11 +882,89 @@ class CR3DApp(tk.Tk):
         self.xs.append(elapsed_s); self.ys.append(mv)
         if len(self.xs) > 5000:
             self.xs, self.ys = self.xs[-5000:], self.ys[-5000:]
+        self.plot_dirty = True
 
     def _redraw_plot(self):
         if not (hasattr(self, "canvas") and self.canvas and self.ax and self.line): return
+        if not self.plot_dirty: return
+        self.plot_dirty = False
         self.line.set_xdata(self.xs); self.line.set_ydata(self.ys)
-        self.ax.relim(); self.ax.autoscale_view(); self.canvas.draw()
+        self.ax.relim(); self.ax.autoscale_view()
+
+        self._update_bars(self.ax_ph, self.ph_bars, self.hist, self.hist.take_dirty(), grow_x=True)
+        if self.dt_hist is not None:
+            dirty = self.dt_hist.take_dirty()
+            if self.dt_rebinned:
+                self.dt_rebinned = False
+                w = self.dt_hist.w
+                for b, rect in enumerate(self.dt_bars):
+                    rect.set_x(b * w); rect.set_width(w)
+                self.ax_dt.set_xlim(0, w * DT_BINS)
+                self.ax_dt.set_ylim(0, 5)
+                dirty = range(DT_BINS)
+            self._update_bars(self.ax_dt, self.dt_bars, self.dt_hist, dirty, shrink_y=True)
+            self._update_dt_fit()
+        self.canvas.draw_idle()
+
+    def _update_bars(self, ax, bars, hist, dirty, grow_x=False, shrink_y=False):
+        # Only the patches whose bin changed since the last frame are touched
+        top, hi = 0, None
+        for b in dirty:
+            h = hist.counts.get(b, 0)
+            bars[b].set_height(h)
+            top = max(top, h)
+            hi = b if hi is None else max(hi, b)
+        if top > 0.95 * ax.get_ylim()[1]:
+            ax.set_ylim(0, top * 1.3)
+        elif shrink_y and dirty:
+            # Windowed histograms lose counts too, so let the axis come back down
+            peak = max(hist.counts.values(), default=0)
+            if peak < 0.4 * ax.get_ylim()[1]:
+                ax.set_ylim(0, max(5, peak * 1.3))
+        if grow_x and hi is not None and (hi + 1) * hist.w > ax.get_xlim()[1]:
+            ax.set_xlim(0, (hi + 1) * hist.w * 1.1)
+
+    def _update_dt_fit(self):
+        # Shifted-exponential MLE over the recent window: the shortest Δt
+        # stands in for the dead time
+        n = len(self.dt_win)
+        t0 = min(self.dt_win) if n else 0.0
+        excess = self.dt_win_sum / n - t0 if n else 0.0
+        if excess <= 0:
+            self.dt_fit.set_data([], []); return
+        lam = 1.0 / excess
+        w = self.dt_hist.w
+        surv = [math.exp(-lam * max(0.0, b * w - t0)) for b in range(DT_BINS + 1)]
+        surv[-1] = 0.0   # last bin collects the overflow
+        self.dt_fit.set_data(self.dt_hist.centers(), [n * (surv[b] - surv[b + 1]) for b in range(DT_BINS)])
+        session = 60.0 * self.dt_count / self.dt_sum if self.dt_sum > 0 else 0.0
+        self.ax_dt.set_title(f"Δt, last {n} (fit: {60.0 * lam:.1f} CPM, session: {session:.1f} CPM)",
+                             color=THEME["accent"])
+
+    def _add_interval(self, dt):
+        self.intervals.append(dt)
+        self.dt_count += 1
+        self.dt_sum += dt
+        if len(self.dt_win) == self.dt_win.maxlen:
+            old = self.dt_win[0]   # about to be evicted by append()
+            self.dt_win_sum -= old
+            if self.dt_hist is not None: self.dt_hist.remove(old)
+        self.dt_win.append(dt)
+        self.dt_win_sum += dt
+        if self.dt_hist is None:
+            if len(self.dt_win) >= DT_WARMUP: self._rebin_dt()
+            return
+        self.dt_hist.add(dt)
+        span = 6.0 * self.dt_win_sum / len(self.dt_win)
+        if not (self.dt_hist.w * DT_BINS / 3 <= span <= self.dt_hist.w * DT_BINS * 1.5):
+            self._rebin_dt()   # rate drifted well away from the current axis
+
+    def _rebin_dt(self):
+        self.dt_win_sum = math.fsum(self.dt_win)   # also clears add/subtract drift
+        span = 6.0 * self.dt_win_sum / len(self.dt_win)
+        self.dt_hist = RunningHist(bin_width=max(span / DT_BINS, 1e-6), max_bins=DT_BINS)
+        for x in self.dt_win: self.dt_hist.add(x)
+        self.dt_rebinned = True
 
     # ---------- CSV ----------
     def _log_row(self, row):
@@ -563,7 +1007,8 @@ class CR3DApp(tk.Tk):
             for key in ("cpm_val","cpm_sigma_val","live_cpm_val","total_val",
                         "since_last_val","mean_dt_val","cv_dt_val",
                         "last_peak_val","peak_val","noise_rms_val","mpv_val",
-                        "runtime_val","deadtime_val","deadfrac_val"):
+                        "runtime_val","deadtime_val","deadfrac_val",
+                        "fw_ver_val","fw_baseline_val","fw_thr_val","fw_pulser_val","fw_status_val"):
                 getattr(self, key).config(text="--")
             return
 
@@ -631,7 +1076,9 @@ class CR3DApp(tk.Tk):
             pass
         if time.perf_counter() > self.hit_flash_until:
             self._set_led_idle()
-        if self.logging and hasattr(self, "canvas") and self.canvas is not None:
+        now = time.perf_counter()
+        if self.logging and hasattr(self, "canvas") and self.canvas is not None and now >= self.next_frame:
+            self.next_frame = now + 1.0 / PLOT_FPS
             self._redraw_plot()
         self._update_sidebar()
         self.after(50, self._ui_heartbeat)
@@ -672,9 +1119,19 @@ class CR3DApp(tk.Tk):
         elif typ == "event":
             self._flash_hit()
             nowp = time.perf_counter()
-            if self.last_event_perf is not None:
-                self.intervals.append(nowp - self.last_event_perf)
+            try:
+                ts_us = int(obj["ts_us"])
+            except:
+                ts_us = None
+            # Δt from the firmware clock (uint32 micros) when available, so it is
+            # not smeared by serial/UI batching
+            if ts_us is not None and self.last_event_ts_us is not None:
+                self._add_interval(((ts_us - self.last_event_ts_us) & 0xFFFFFFFF) / 1e6)
+            elif ts_us is None and self.last_event_perf is not None:
+                self._add_interval(nowp - self.last_event_perf)
+            if ts_us is not None: self.last_event_ts_us = ts_us
             self.last_event_perf = nowp
+            self.plot_dirty = True
 
             self.event_times.append(nowp)
             self.session_total += 1
@@ -708,12 +1165,23 @@ class CR3DApp(tk.Tk):
                 (f"{self.press_hPa:.1f}" if self.press_hPa is not None else "")
             ])
 
-        elif typ == "hello":
-            pass
+        elif typ == "fw_config":
+            self._on_fw_config(obj)
+
+def _cli_float(argv, flag, default):
+    if flag not in argv: return default
+    i = argv.index(flag)
+    try:
+        return float(argv[i + 1])
+    except (IndexError, ValueError):
+        sys.exit(f"{flag} expects a number")
 
 if __name__ == "__main__":
+    argv = sys.argv[1:]
     try:
-        app = CR3DApp()
+        app = CR3DApp(sim=any(a.startswith("--sim") for a in argv),
+                      sim_rate_hz=_cli_float(argv, "--sim-rate", SIM_RATE_HZ),
+                      sim_speed=_cli_float(argv, "--sim-speed", SIM_SPEED))
         app.mainloop()
     except KeyboardInterrupt:
         sys.exit(0)
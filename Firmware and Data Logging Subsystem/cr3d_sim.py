@@ -0,0 +1,494 @@
+# ====== cr3d_sim.py ======
+"""Vectorised end-to-end CR3D detector simulator.
+
+Poisson muon arrivals -> AFE pulse shape + noise at A2 -> model of the
+ArduinoFirmware.ino v1.4 trigger loop -> firmware-format JSON lines.
+
+The firmware model follows the sketch step by step: ADC read timing of
+adc_toss_then_read(), FIXED / AUTO (31-sample median) baseline, float32
+threshold compare, PEAK_HOLD_US peak search, DEAD_TIME_US, uint32 micros()
+and Print::printFloat() formatting. At 115200 baud the loop is bound by the
+~72-byte sample line it prints every iteration, so the trigger is polled on
+that cadence (~6.25 ms) rather than continuously; this is what sets the
+trigger efficiency and the dead time per event.
+
+Simplifications: the loop grid is not re-phased after an event (blind time
+is rounded up to whole loop periods), and the AUTO median ignores samples
+skipped while the loop is blind.
+"""
+import math, threading, time
+from collections import deque
+
+import numpy as np
+
+# ---------------- Firmware (ArduinoFirmware.ino v1.4) ----------------
+FW_VERSION        = "1.4"
+FW_UNIT           = "CR3D-nano-a2"
+VREF_V            = 5.00
+LSB_mV            = np.float32(VREF_V * 1000.0) / np.float32(1023.0)  # float32, as on AVR
+ADC_MAX           = 1023
+THRESHOLD_mV      = 50.0
+FIXED_BASELINE_mV = 880.0
+PEAK_HOLD_US      = 4000
+DEAD_TIME_US      = 300
+SAMPLE_EMIT_US    = 1000
+BLEN              = 31
+PULSE_US          = 10
+PERIOD_MS         = 5000
+LED_US            = 200
+
+# ---------------- ATmega328P @ 16 MHz timing ----------------
+ADC_CONV_US       = 112                        # analogRead(), prescaler 128
+READ_US           = 2 * ADC_CONV_US + 150      # adc_toss_then_read(pin, 150)
+HOLD_READ_US      = 2 * ADC_CONV_US + 100      # reads inside the peak-hold loop
+N_HOLD_READS      = math.ceil(PEAK_HOLD_US / HOLD_READ_US)
+LOOP_CPU_US       = 2 * READ_US + 40           # bg + trigger read + bookkeeping
+BAUD              = 115200
+SAMPLE_LINE_BYTES = 72                         # typical sample line incl. \r\n
+EVENT_LINE_BYTES  = 120                        # typical event line incl. \r\n
+
+# ---------------- AFE (AFE_Sim.asc) ----------------
+TAU_FALL_US       = 5.6e3 * 220e-9 * 1e6       # R5*C6 output RC, ~1.23 ms
+TAU_RISE_US       = 20.0
+IDLE_mV           = 855.0                      # measured idle level at A2
+NOISE_mV          = 2.5                        # rms, ~0.5 LSB
+PULSER_mV         = 400.0                      # D8 RC-injection pulse height
+
+INITIAL_STATE = {
+    "t_us":          200000.0,   # micros() when setup() finishes
+    "last_event_us": 0.0,
+    "trig_ok_us":    0.0,
+    "sample_ok_us":  0.0,
+    "next_pulse_us": 300000.0,   # pulser_init(): first pulse after 100 ms
+    "bl_buf":        None,
+}
+
+
+# ------ Amplitude spectra: callable(rng, n) -> mV at A2 ------
+def landau_spectrum(mpv_mv=250.0, width_mv=40.0):
+    """Moyal approximation to the Landau energy-loss spectrum."""
+    def draw(rng, n):
+        z = rng.standard_normal(n)
+        return mpv_mv - width_mv * np.log(z * z)      # -ln(chi2_1) ~ Moyal
+    return draw
+
+def gauss_spectrum(mean_mv=250.0, sigma_mv=30.0):
+    def draw(rng, n):
+        return rng.normal(mean_mv, sigma_mv, n)
+    return draw
+
+
+# ------ AFE / ADC ------
+def _shape_norm(tau_rise_us, tau_fall_us):
+    tp = tau_rise_us * tau_fall_us / (tau_fall_us - tau_rise_us) * math.log(tau_fall_us / tau_rise_us)
+    return math.exp(-tp / tau_fall_us) - math.exp(-tp / tau_rise_us)
+
+def pulse_shape(dt_us, tau_rise_us=TAU_RISE_US, tau_fall_us=TAU_FALL_US):
+    """Unit-peak double exponential; zero for dt < 0."""
+    dt = np.maximum(dt_us, 0.0)
+    return (np.exp(-dt / tau_fall_us) - np.exp(-dt / tau_rise_us)) / _shape_norm(tau_rise_us, tau_fall_us)
+
+def _time_over_threshold(amp_mv, thr_mv, tau_rise_us=TAU_RISE_US, tau_fall_us=TAU_FALL_US, step_us=1.0):
+    # Time each pulse of height amp_mv spends at or above thr_mv: the shape is
+    # unimodal, so this is the number of grid points above thr/amp
+    y = np.sort(pulse_shape(np.arange(0.0, tau_fall_us * math.log(ADC_MAX), step_us), tau_rise_us, tau_fall_us))
+    with np.errstate(divide="ignore"):
+        need = np.where(amp_mv > 0, thr_mv / np.asarray(amp_mv, float), np.inf)
+    return step_us * (len(y) - np.searchsorted(y, need, "left"))
+
+def _shape_series(dt0, step, count, tau_rise_us=TAU_RISE_US, tau_fall_us=TAU_FALL_US):
+    # pulse_shape(dt0 + j*step) for j < count with one exp per pulse: the fall
+    # term is advanced by a constant factor, the rise term is only evaluated
+    # within 40 tau_rise of the edge
+    norm = _shape_norm(tau_rise_us, tau_fall_us)
+    fall = np.exp(np.minimum(-dt0 / tau_fall_us, 700.0)) / norm
+    decay = math.exp(-step / tau_fall_us)
+    for j in range(count):
+        dt = dt0 + j * step
+        y = np.where(dt >= 0, fall, 0.0)
+        near = np.flatnonzero((dt >= 0) & (dt < 40.0 * tau_rise_us))
+        y[near] -= np.exp(-dt[near] / tau_rise_us) / norm
+        yield y
+        fall *= decay
+
+def _adc(mv):
+    # Ideal 10-bit SAR against VREF
+    return np.clip(np.floor(mv * (1024.0 / (VREF_V * 1000.0))), 0, ADC_MAX).astype(np.int64)
+
+def _adc_mv(adc):
+    return adc.astype(np.float32) * LSB_mV
+
+def _printfloat_units(x, digits=2):
+    # Print::printFloat(x, digits) on AVR (float32 math, rounds half up),
+    # as an integer count of 10**-digits
+    rounding = np.float32(0.5)
+    for _ in range(digits): rounding = rounding / np.float32(10)
+    x = np.asarray(x, np.float32) + rounding
+    ip = np.floor(x)
+    out = ip.astype(np.int64)
+    r = x - ip
+    for _ in range(digits):
+        r = r * np.float32(10); d = np.floor(r); r = r - d
+        out = out * 10 + d.astype(np.int64)
+    return out
+
+def _printfloat(x, digits):
+    # Scalar Print::printFloat() as bytes, for acks and the hello line
+    u = int(_printfloat_units(x, digits))
+    return b"%d.%0*d" % (u // 10**digits, digits, u % 10**digits)
+
+def _deposit(t_arr, amp, g0, L, n, K, tau):
+    # Sum of pulses sampled on the read grid g0 + k*L (k < n), K reads per pulse
+    k0 = np.maximum(np.ceil((t_arr - g0) / L).astype(np.int64), 0)
+    out = np.zeros(n + 1)
+    for j, y in enumerate(_shape_series(g0 + k0 * L - t_arr, L, K, *tau)):
+        out += np.bincount(np.minimum(k0 + j, n), amp * y, minlength=n + 1)
+    return out[:n]
+
+def _nonparalyzable(c, nb):
+    """Mask of candidate slots c (sorted) accepted with nb-slot blind time.
+
+    Candidates more than nb after their predecessor always fire; the chains
+    between them are walked for all clusters at once.
+    """
+    keep = np.zeros(len(c), bool)
+    if not len(c): return keep
+    lead = np.flatnonzero(np.diff(c, prepend=c[0] - nb) >= nb)
+    end = np.append(lead[1:], len(c))
+    keep[lead] = True
+    busy = end - lead > 1
+    cur, end = lead[busy], end[busy]
+    while cur.size:
+        nxt = np.searchsorted(c, c[cur] + nb)
+        ok = nxt < end
+        cur, end = nxt[ok], end[ok]
+        keep[cur] = True
+    return keep
+
+
+# ------ Simulation ------
+class SimResult:
+    """Ground truth plus everything the firmware emitted for one run."""
+    def __init__(self, **kw):
+        self.__dict__.update(kw)
+
+def simulate(duration_s, rate_hz, spectrum=None, *, mode="FIXED",
+             baseline_mv=FIXED_BASELINE_mV, threshold_mv=THRESHOLD_mV,
+             pulser=False, pulser_mv=PULSER_mV, period_ms=PERIOD_MS,
+             idle_mv=IDLE_mV, noise_mv=NOISE_mV,
+             tau_rise_us=TAU_RISE_US, tau_fall_us=TAU_FALL_US,
+             baud=BAUD, state=None, rng=None):
+    """Simulate duration_s of detector + firmware.
+
+    Pass the returned result's .state back in to continue the same run
+    (dead time, AUTO baseline buffer and pulser schedule carry over).
+    """
+    rng = np.random.default_rng(rng)
+    spectrum = spectrum or landau_spectrum()
+    st = dict(INITIAL_STATE if state is None else state)
+    tau = (tau_rise_us, tau_fall_us)
+
+    # Loop cadence: CPU-bound, or serial-bound by the per-iteration sample line
+    byte_us = 1e7 / baud
+    L = max(LOOP_CPU_US, SAMPLE_LINE_BYTES * byte_us)
+    emit_every = max(1, math.ceil(SAMPLE_EMIT_US / L))
+    t0 = st["t_us"]
+    ns = int(duration_s * 1e6 // L)
+    T = ns * L
+    s = t0 + L * np.arange(ns)                     # loop-top micros()
+    horizon = tau_fall_us * math.log(ADC_MAX)      # pulse < 1 LSB after this
+    K = math.ceil(horizon / L) + 1
+
+    # Muons: Poisson count, sorted uniform times via normalised exponential gaps
+    n = rng.poisson(rate_hz * T / 1e6)
+    gaps = rng.exponential(1.0, n + 1)
+    t_mu = t0 + T * (np.cumsum(gaps)[:-1] / gaps.sum())
+    a_mu = np.maximum(spectrum(rng, n), 0.0)
+
+    # Pulser: rising edge on a loop top, next one PERIOD_MS after the falling edge
+    ks = np.zeros(0, np.int64)
+    if pulser:
+        k0 = max(0, math.ceil((st["next_pulse_us"] - t0) / L))
+        ks = np.arange(k0, ns, 1 + math.ceil(period_ms * 1000.0 / L))
+        if ks.size:
+            st["next_pulse_us"] = t0 + (ks[-1] + 1) * L + period_ms * 1000.0
+    t_pu = s[ks]
+    t_all = np.concatenate([t_mu, t_pu])
+    a_all = np.concatenate([a_mu, np.full(len(t_pu), pulser_mv)])
+
+    # A2 at the background and trigger reads of every loop iteration
+    sig_bg = _deposit(t_all, a_all, t0 + READ_US, L, ns, K, tau)
+    sig_tr = _deposit(t_all, a_all, t0 + 2 * READ_US, L, ns, K, tau)
+    bg_adc = _adc(idle_mv + sig_bg + noise_mv * rng.standard_normal(ns))
+    tr_adc = _adc(idle_mv + sig_tr + noise_mv * rng.standard_normal(ns))
+
+    # Baseline
+    buf = st["bl_buf"]
+    if buf is None:
+        buf = _adc(idle_mv + noise_mv * rng.standard_normal(BLEN))
+    hist = np.concatenate([buf, bg_adc[::emit_every]])
+    st["bl_buf"] = hist[-BLEN:]
+    if str(mode).upper() == "AUTO":
+        win = np.lib.stride_tricks.sliding_window_view(hist, BLEN)[1:]
+        bl_adc = np.partition(win, BLEN // 2, axis=1)[:, BLEN // 2][np.arange(ns) // emit_every]
+        bl_mv = _adc_mv(bl_adc)
+    else:
+        bl_mv = np.float32(baseline_mv)
+        bl_adc = np.full(ns, int(bl_mv / LSB_mV + np.float32(0.5)))
+
+    # Trigger: float32 compare, then non-paralyzable blind time in loop slots
+    # Same compare on every ADC code -> lowest code that triggers -> the A2
+    # level, and so the pulse height, it needs (for the efficiency estimate)
+    ok = (_adc_mv(np.arange(ADC_MAX + 1)) - np.float32(np.mean(bl_mv))) >= np.float32(threshold_mv)
+    c_min = int(np.argmax(ok)) if ok.any() else ADC_MAX + 1
+    thr_sig_mv = c_min * (VREF_V * 1000.0 / 1024.0) - idle_mv
+    over = (_adc_mv(tr_adc) - bl_mv) >= np.float32(threshold_mv)
+    hold_us = N_HOLD_READS * HOLD_READ_US
+    ev_off = 2 * READ_US + hold_us                 # loop top -> ts_event
+    resume_off = max(ev_off + LED_US, (SAMPLE_LINE_BYTES + EVENT_LINE_BYTES) * byte_us)
+    nb = math.ceil(max(resume_off, ev_off + DEAD_TIME_US) / L)
+    nsup = math.ceil(resume_off / L)
+
+    cand = np.flatnonzero(over & (s >= st["trig_ok_us"]))
+    ev_k = cand[_nonparalyzable(cand, nb)]
+    E = len(ev_k)
+
+    # Peak hold: N_HOLD_READS reads after the trigger read, pile-up included
+    ev_trig = s[ev_k] + 2 * READ_US
+    ev_ts = s[ev_k] + ev_off
+    start = np.maximum(ev_trig - horizon, np.concatenate([[-np.inf], ev_ts[:-1]]))
+    w = np.searchsorted(start, t_all, "right") - 1
+    inwin = (w >= 0) & (t_all <= ev_ts[np.maximum(w, 0)] if E else np.zeros(len(t_all), bool))
+    w, t_w, a_w = w[inwin], t_all[inwin], a_all[inwin]
+    dt0 = ev_trig[w] + HOLD_READ_US - t_w          # to the first hold read
+    # Pulses well before the hold are pure exponential tails: sum them once
+    tail = dt0 >= 40.0 * tau_rise_us
+    s0 = np.bincount(w[tail], a_w[tail] * np.exp(-dt0[tail] / tau_fall_us), minlength=E) / _shape_norm(*tau)
+    sig_hold = s0[:, None] * np.exp(-HOLD_READ_US * np.arange(N_HOLD_READS) / tau_fall_us)
+    w, a_w, dt0 = w[~tail], a_w[~tail], dt0[~tail]
+    for m, y in enumerate(_shape_series(dt0, HOLD_READ_US, N_HOLD_READS, *tau)):
+        sig_hold[:, m] += np.bincount(w, a_w * y, minlength=E)
+    hold_adc = _adc(idle_mv + sig_hold + noise_mv * rng.standard_normal((E, N_HOLD_READS)))
+    peak_adc = np.maximum(tr_adc[ev_k], hold_adc.max(axis=1) if E else tr_adc[ev_k])
+    dead = np.diff(ev_ts, prepend=st["last_event_us"])
+
+    # Ground truth per event: index into t_mu, -1 pulser, -2 noise
+    i_mu = np.searchsorted(t_mu, ev_trig, "right") - 1
+    i_pu = np.searchsorted(t_pu, ev_trig, "right") - 1
+    last_mu = np.where(i_mu >= 0, t_mu[np.maximum(i_mu, 0)] if n else -np.inf, -np.inf)
+    last_pu = np.where(i_pu >= 0, t_pu[np.maximum(i_pu, 0)] if len(t_pu) else -np.inf, -np.inf)
+    src = np.where(last_mu >= last_pu, i_mu, -1)
+    src[ev_trig - np.maximum(last_mu, last_pu) > horizon] = -2
+
+    # Samples: one per emit slot while the loop is running
+    run = np.zeros(ns + 1, np.int64)
+    np.add.at(run, np.minimum(ev_k + 1, ns), 1)
+    np.add.at(run, np.minimum(ev_k + nsup, ns), -1)
+    emit = (np.cumsum(run[:-1]) == 0) & (np.arange(ns) % emit_every == 0) & (s >= st["sample_ok_us"])
+    k_scope = ks + 1
+    k_scope = k_scope[k_scope < ns]
+    scope_adc = _adc(idle_mv + sig_bg[k_scope] + noise_mv * rng.standard_normal(len(k_scope)))
+
+    st["t_us"] = t0 + T
+    if E:
+        st["last_event_us"] = ev_ts[-1]
+        st["trig_ok_us"] = s[ev_k[-1]] + nb * L
+        st["sample_ok_us"] = s[ev_k[-1]] + nsup * L
+
+    return SimResult(
+        duration_s=T / 1e6, loop_us=L, dead_us=(nb - 1) * L, state=st,
+        t_mu=t_mu, a_mu=a_mu, t_pulser=t_pu,
+        mu_tot_us=_time_over_threshold(a_mu, thr_sig_mv, *tau),
+        n_triggerable=int(over.sum()),
+        sample_ts=s[emit], sample_adc=bg_adc[emit],
+        scope_ts=s[k_scope], scope_adc=scope_adc,
+        event_ts=ev_ts, event_adc_peak=peak_adc, event_baseline_adc=bl_adc[ev_k],
+        event_dead_us=dead, event_src=src,
+    )
+
+def rate_check(res):
+    """Muon rate recovered from the events against the true arrival rate.
+
+    The firmware only looks at A2 once per loop, so a muon is seen only if
+    a trigger read lands inside its time over threshold. At the serial-bound
+    6.25 ms cadence and default threshold that is a ~1.5 ms window, so the
+    raw polling efficiency is only about 27%: the measured rate is roughly
+    a quarter of the true one.
+    Events traced back to a muon (event_src >= 0) are corrected for dead
+    time and then divided by that efficiency, estimated from each muon's
+    time over threshold (min(ToT / loop_us, 1)). The result is compared
+    with len(t_mu) / T. 'triggerable' (over-threshold loop slots) comes from
+    the same slot grid as the events, so it is kept as a diagnostic only.
+    The estimate assumes pulses rarely overlap (rate x ~8 ms << 1); at
+    higher rates A2 piles up and estimated_over_true collapses.
+    """
+    T = res.duration_s
+    n = len(res.event_ts)
+    n_mu = int(np.count_nonzero(res.event_src >= 0))
+    live_s = T - n * res.dead_us / 1e6
+    true = len(res.t_mu) / T
+    eff = float(np.minimum(res.mu_tot_us / res.loop_us, 1.0).mean()) if len(res.t_mu) else float("nan")
+    corr = n_mu / live_s if live_s > 0 else float("nan")
+    est = corr / eff if eff > 0 else float("nan")
+    return {
+        "true_rate_hz":        true,
+        "measured_rate_hz":    n / T,
+        "muon_event_rate_hz":  n_mu / T,
+        "live_fraction":       live_s / T,
+        "corrected_rate_hz":   corr,
+        "poll_efficiency":     eff,
+        "estimated_rate_hz":   est,
+        "estimated_over_true": est / true if true > 0 else float("nan"),
+        "triggerable_rate_hz": res.n_triggerable / T,
+    }
+
+
+# ------ Firmware-format output ------
+def hello_line(cfg):
+    return (b'{"type":"hello","ver":"%s","unit":"%s","vref_V":%s,"baseline_mode":"%s",'
+            b'"fixed_baseline_mV":%s,"threshold_mV":%s,'
+            b'"pulser":{"enabled":%s,"pulse_us":%d,"period_ms":%d}}\r\n') % (
+        FW_VERSION.encode(), FW_UNIT.encode(), _printfloat(VREF_V, 3), cfg["MODE"].encode(),
+        _printfloat(cfg["BASELINE_MV"], 1), _printfloat(cfg["THRESHOLD_MV"], 1),
+        b"true" if cfg["PULSER"] == "ON" else b"false", cfg["PULSE_US"], cfg["PERIOD_MS"])
+
+def stream_lines(res):
+    """Firmware output for res as a time-ordered list of (ts_us, line)."""
+    out = []
+    for ts, adc in ((res.sample_ts, res.sample_adc), (res.scope_ts, res.scope_adc)):
+        ts = ts.astype(np.int64)
+        c = _printfloat_units(_adc_mv(adc))
+        out += [(t, b'{"type":"sample","ts_us":%d,"adc":%d,"mv":%d.%02d,"dht_C":null}\r\n'
+                    % (t & 0xFFFFFFFF, a, v // 100, v % 100))
+                for t, a, v in zip(ts.tolist(), adc.tolist(), c.tolist())]
+    ts = res.event_ts.astype(np.int64)
+    c = _printfloat_units(_adc_mv(res.event_adc_peak))
+    dead = res.event_dead_us.astype(np.int64) & 0xFFFFFFFF
+    out += [(t, b'{"type":"event","ts_us":%d,"adc_peak":%d,"mv_peak":%d.%02d,'
+                b'"baseline_adc":%d,"dead_us":%d,"dht_C":null}\r\n'
+                % (t & 0xFFFFFFFF, a, v // 100, v % 100, b, d))
+            for t, a, v, b, d in zip(ts.tolist(), res.event_adc_peak.tolist(), c.tolist(),
+                                     res.event_baseline_adc.tolist(), dead.tolist())]
+    out.sort(key=lambda x: x[0])
+    return out
+
+
+# ------ Serial stand-in for the logger ------
+class SimSerial:
+    """Drop-in for serial.Serial streaming simulated firmware output.
+
+    Answers SET commands with the firmware's acks; new settings apply from
+    the next simulated chunk. speed=1.0 paces lines in real time, None emits
+    them as fast as readline() is called.
+    """
+    def __init__(self, rate_hz=1.0, spectrum=None, speed=1.0, chunk_s=1.0,
+                 boot_s=0.5, seed=None, port="SIM", **afe):
+        self.port = port
+        self.rate_hz = rate_hz
+        self.spectrum = spectrum
+        self.speed = speed
+        self.chunk_s = chunk_s
+        self.afe = afe
+        self.rng = np.random.default_rng(seed)
+        self.cfg = {"MODE": "FIXED", "BASELINE_MV": FIXED_BASELINE_mV, "THRESHOLD_MV": THRESHOLD_mV,
+                    "PULSER": "ON", "PULSE_US": PULSE_US, "PERIOD_MS": PERIOD_MS}
+        self.state = None
+        self.lock = threading.Lock()
+        self.acks = deque()
+        self.out = deque([(INITIAL_STATE["t_us"], hello_line(self.cfg))])
+        self.t_wall0 = time.perf_counter() + boot_s - INITIAL_STATE["t_us"] / 1e6 / (speed or 1.0)
+        self.is_open = True
+
+    def close(self):
+        self.is_open = False
+
+    def write(self, data):
+        for line in data.decode(errors="ignore").splitlines():
+            ack = self._handle_command(line)
+            if ack is not None:
+                with self.lock: self.acks.append(ack)
+        return len(data)
+
+    def readline(self):
+        while self.is_open:
+            with self.lock:
+                if self.acks: return self.acks.popleft()
+            if not self.out: self._next_chunk()
+            ts, line = self.out[0]
+            if self.speed:
+                wait = self.t_wall0 + ts / 1e6 / self.speed - time.perf_counter()
+                if wait > 0:
+                    time.sleep(min(wait, 0.02))
+                    continue
+            self.out.popleft()
+            return line
+        return b""
+
+    def _next_chunk(self):
+        with self.lock: cfg = dict(self.cfg)
+        res = simulate(self.chunk_s, self.rate_hz, self.spectrum, mode=cfg["MODE"],
+                       baseline_mv=cfg["BASELINE_MV"], threshold_mv=cfg["THRESHOLD_MV"],
+                       pulser=cfg["PULSER"] == "ON", period_ms=cfg["PERIOD_MS"],
+                       state=self.state, rng=self.rng, **self.afe)
+        self.state = res.state
+        self.out.extend(stream_lines(res))
+        if not self.out:   # keep the clock moving through an empty chunk
+            self.out.append((res.state["t_us"], b"\r\n"))
+
+    def _handle_command(self, line):
+        # Mirrors handleCommandLine(): case-insensitive, silent on bad values
+        s = line.strip(); u = s.upper()
+        with self.lock:
+            if u.startswith("SET MODE "):
+                for v in ("AUTO", "FIXED"):
+                    if u.endswith(v):
+                        self.cfg["MODE"] = v
+                        return b'{"type":"ack","cmd":"MODE","val":"%s"}\r\n' % v.encode()
+            elif u.startswith(("SET BASELINE_MV ", "SET THRESHOLD_MV ")):
+                key = u.split()[1]
+                v = _to_float(s[len("SET ") + len(key) + 1:])
+                if v >= 0.0:
+                    self.cfg[key] = v
+                    return b'{"type":"ack","cmd":"%s","val":%s}\r\n' % (key.encode(), _printfloat(v, 1))
+            elif u.startswith("SET PULSER "):
+                for v in ("ON", "OFF"):
+                    if u.endswith(v):
+                        self.cfg["PULSER"] = v
+                        return b'{"type":"ack","cmd":"PULSER","val":"%s"}\r\n' % v.encode()
+            elif u.startswith(("SET PULSE_US ", "SET PERIOD_MS ")):
+                key = u.split()[1]
+                v = int(_to_float(s[len("SET ") + len(key) + 1:]))
+                if v > 0:
+                    self.cfg[key] = v
+                    return b'{"type":"ack","cmd":"%s","val":%d}\r\n' % (key.encode(), v)
+        return None
+
+def _to_float(s):
+    # String::toFloat() returns 0 on garbage
+    try: return float(s.strip())
+    except ValueError: return 0.0
+
+
+if __name__ == "__main__":
+    import argparse
+    ap = argparse.ArgumentParser(description="CR3D detector + firmware simulator")
+    ap.add_argument("--rate", type=float, default=1e6, help="muon rate (Hz)")
+    ap.add_argument("--duration", type=float, default=10.0, help="simulated time (s)")
+    ap.add_argument("--mode", default="FIXED", choices=["FIXED", "AUTO"])
+    ap.add_argument("--threshold", type=float, default=THRESHOLD_mV, help="mV over baseline")
+    ap.add_argument("--pulser", action="store_true")
+    ap.add_argument("--seed", type=int, default=None)
+    ap.add_argument("--out", help="write the firmware stream to this file")
+    a = ap.parse_args()
+
+    t = time.perf_counter()
+    res = simulate(a.duration, a.rate, mode=a.mode, threshold_mv=a.threshold,
+                   pulser=a.pulser, rng=a.seed)
+    dt = time.perf_counter() - t
+    print(f"{len(res.t_mu):d} muons in {dt:.2f} s ({len(res.t_mu)/dt/1e6:.2f} M/s), "
+          f"{len(res.event_ts):d} events, loop {res.loop_us:.0f} us, dead {res.dead_us:.0f} us/event")
+    for k, v in rate_check(res).items():
+        print(f"  {k:20s} {v:.4g}")
+    if a.out:
+        with open(a.out, "wb") as f:
+            f.writelines(line for _, line in stream_lines(res))